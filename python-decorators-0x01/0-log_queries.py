@@ -1,29 +1,234 @@
 import sqlite3
 import functools
+import atexit
+import bisect
+import os
+import random
+import re
+import sys
+import threading
+import time
 from datetime import datetime
+from queue import Queue, Empty, Full
 
 
-def log_queries(func):
-    """ Decorator to log SQL queries to query.log """
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Get the query from args or kwargs
-        query = kwargs['query'] if 'query' in kwargs else args[0]
-        # Get the current timestamp
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Make the log entry
-        log_entry = f"[{timestamp}] {func.__name__}: {query}\n"
-
-        # Append the log entry to query.log
-        with open('query.log', 'a') as log_file:
-            log_file.write(log_entry)
-        
-        # Print the log entry to the console
-        print(log_entry.strip())
-        
-        return func(*args, **kwargs)
-    return wrapper
+class QueryLogWriter(threading.Thread):
+    """Background thread that appends log entries to a file in batches
+
+    Callers only put raw entries on a queue; the thread formats and writes whatever
+    has piled up (up to batch_size entries) in one write, at least every
+    flush_interval seconds.
+    The file is rotated to path.1 ... path.<backup_count> when it grows past max_bytes.
+    The queue holds at most max_queue entries: when logging outpaces the disk, or
+    the file can't be written, entries are dropped and counted in `dropped`
+    instead of piling up in memory.
+    """
+    def __init__(self, path='query.log', max_bytes=10 * 1024 * 1024, backup_count=3,
+                 batch_size=512, flush_interval=1.0, echo=True, max_queue=10000):
+        super().__init__(name="query-log-writer", daemon=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.echo = echo
+        self.queue = Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._failing = False
+        self._done = object()
+
+    def submit(self, timestamp, name, query, duration, rows=None):
+        """Queue one log entry, without blocking (it is dropped if the queue is full)"""
+        try:
+            self.queue.put_nowait((timestamp, name, query, duration, rows))
+        except Full:
+            self._drop(1)
+
+    def _drop(self, entries):
+        with self._dropped_lock:
+            self.dropped += entries
+
+    @staticmethod
+    def format(timestamp, name, query, duration, rows):
+        """Make the log line of an entry"""
+        timestamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        rows = "" if rows is None else f", {rows} rows"
+        return f"[{timestamp}] {name}: {query} ({duration * 1000:.3f} ms{rows})\n"
+
+    def run(self):
+        log_file = None
+        try:
+            while True:
+                try:
+                    entries = [self.queue.get(timeout=self.flush_interval)]
+                except Empty:
+                    continue
+                # Take whatever else is already waiting, up to batch_size entries
+                while len(entries) < self.batch_size:
+                    try:
+                        entries.append(self.queue.get_nowait())
+                    except Empty:
+                        break
+
+                stopping = self._done in entries
+                batch = ''.join(self.format(*entry) for entry in entries if entry is not self._done)
+                if batch:
+                    try:
+                        log_file = self._write(log_file, batch)
+                        self._failing = False
+                    except OSError as error:
+                        # Drop the batch but keep running: the file may be writable again later
+                        self._drop(len(entries) - stopping)
+                        if not self._failing:
+                            sys.stderr.write(f"query log: cannot write {self.path} ({error}), dropping entries\n")
+                            self._failing = True
+                        if log_file is not None:
+                            log_file.close()
+                            log_file = None
+                    if self.echo:
+                        sys.stdout.write(batch)
+                if stopping:
+                    return
+        finally:
+            if log_file is not None:
+                log_file.close()
+
+    def _write(self, log_file, batch):
+        """Write a batch, (re)opening and rotating the file as needed, and return the open file"""
+        if log_file is None:
+            log_file = open(self.path, 'a')
+        log_file.write(batch)
+        log_file.flush()
+        if log_file.tell() >= self.max_bytes:
+            # Reopened on the next batch
+            log_file.close()
+            log_file = None
+            self.rotate()
+        return log_file
+
+    def rotate(self):
+        """Shift query.log to query.log.1, query.log.1 to query.log.2, and so on"""
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self):
+        """Write out the queued entries and stop the thread"""
+        if self.is_alive():
+            self.queue.put(self._done)
+            self.join()
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_query(query):
+    """Reduce a query to its shape: literals become ?, whitespace and case are collapsed
+
+    >>> normalize_query("SELECT * FROM users WHERE id = 1 AND name IN ('a', 'b')")
+    'SELECT * FROM USERS WHERE ID = ? AND NAME IN (?)'
+    """
+    shape = re.sub(r"'(?:[^']|'')*'", "?", query)
+    shape = re.sub(r"\b\d+(?:\.\d+)?\b", "?", shape)
+    shape = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?)", shape)
+    return re.sub(r"\s+", " ", shape).strip().upper()
+
+
+class QueryProfile:
+    """Latency histogram, call count and row count for each query shape"""
+    # Upper bounds of the latency buckets, in milliseconds (the last one is open)
+    BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.shapes = {}
+
+    def record(self, query, duration, rows=None):
+        """Add one call of query that took duration seconds and returned rows rows"""
+        shape = normalize_query(query)
+        bucket = bisect.bisect_left(self.BUCKETS_MS, duration * 1000)
+        with self._lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = {
+                    'calls': 0, 'total': 0.0, 'max': 0.0, 'rows': 0,
+                    'histogram': [0] * (len(self.BUCKETS_MS) + 1),
+                }
+            stats['calls'] += 1
+            stats['total'] += duration
+            stats['max'] = max(stats['max'], duration)
+            stats['rows'] += rows or 0
+            stats['histogram'][bucket] += 1
+
+    def top(self, n=10, by='total'):
+        """Return the n slowest shapes as (shape, stats), by 'total', 'mean' or 'max' time"""
+        with self._lock:
+            items = [(shape, dict(stats, histogram=list(stats['histogram'])))
+                     for shape, stats in self.shapes.items()]
+        for _, stats in items:
+            stats['mean'] = stats['total'] / stats['calls']
+        return sorted(items, key=lambda item: item[1][by], reverse=True)[:n]
+
+    def dump(self, n=10, by='total', file=None):
+        """Print the n slowest shapes with their latency histograms"""
+        file = file or sys.stdout
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        for shape, stats in self.top(n, by):
+            print(f"{stats['total'] * 1000:10.3f} ms total  {stats['mean'] * 1000:8.3f} ms mean  "
+                  f"{stats['max'] * 1000:8.3f} ms max  {stats['calls']:6} calls  "
+                  f"{stats['rows']:8} rows  {shape}", file=file)
+            histogram = "  ".join(f"{label}: {count}"
+                                  for label, count in zip(labels, stats['histogram']) if count)
+            print(f"{'':12}{histogram}", file=file)
+
+
+query_profile = QueryProfile()
+query_log = QueryLogWriter()
+query_log.start()
+# Entries still queued when the program exits are written out first
+atexit.register(query_log.close)
+
+
+def log_queries(func=None, *, sample_rate=1.0, writer=None, profile=None):
+    """ Decorator to log SQL queries to query.log and profile them
+
+    Entries are handed to a background QueryLogWriter (query_log by default), so
+    the call only pays for queueing them. Each entry records how long the
+    call took and how many rows it returned (when the result is a list or tuple).
+    Every logged call is also added to a QueryProfile (query_profile by default)
+    under its normalized shape; query_profile.dump() shows the slowest shapes.
+    With sample_rate < 1 only that fraction of calls is logged and profiled.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if sample_rate < 1 and random.random() >= sample_rate:
+                return func(*args, **kwargs)
+
+            # Get the query from args or kwargs
+            query = kwargs['query'] if 'query' in kwargs else args[0]
+            # Get the current timestamp
+            timestamp = time.time()
+
+            start = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                duration = time.perf_counter() - start
+                rows = len(result) if isinstance(result, (list, tuple)) else None
+                (profile or query_profile).record(query, duration, rows)
+                # Queue the log entry, the writer thread formats and writes it
+                (writer or query_log).submit(timestamp, func.__name__, query, duration, rows)
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 @log_queries
 def fetch_all_users(query):
@@ -35,4 +240,4 @@ def fetch_all_users(query):
     return results
 
 #### fetch users while logging the query
-users = fetch_all_users(query="SELECT * FROM users")
\ No newline at end of file
+users = fetch_all_users(query="SELECT * FROM users")
@@ -1,16 +1,108 @@
-import sqlite3 
+import sqlite3
 import functools
+import inspect
+import threading
+from queue import LifoQueue, Empty
 
-def with_db_connection(func):
-    """A decorator that automatically handles opening and closing database connections""" 
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
+try:
+    import aiosqlite
+except ImportError:  # Only needed to decorate coroutine functions
+    aiosqlite = None
+
+
+class ConnectionPool:
+    """A bounded pool of sqlite3 connections to one database file
+
+    Connections are kept open between calls, so they also keep their prepared
+    statement cache (cached_statements) from one call to the next.
+    """
+    def __init__(self, path="users.db", size=5, timeout=30, cached_statements=256):
+        self.path = path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Borrow a connection, opening one if none is idle"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No connection to {self.path} available after {self.timeout}s")
         try:
-            return func(conn, *args, **kwargs)
-        finally:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        try:
+            # A pooled connection may be borrowed by another thread next time
+            return sqlite3.connect(self.path, check_same_thread=False,
+                                   cached_statements=self.cached_statements)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Give a connection back, dropping whatever it left uncommitted like close() would"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except sqlite3.Error:
             conn.close()
-    return wrapper
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+def with_db_connection(func=None, *, path="users.db", pool=None):
+    """A decorator that automatically handles opening and closing database connections
+
+    Used bare (@with_db_connection) it opens and closes path for every call.
+    With @with_db_connection(pool=ConnectionPool(...)) the connection is borrowed
+    from the pool and given back after the call instead.
+    Coroutine functions get an aiosqlite connection, opened and closed without
+    blocking the event loop (pools are for synchronous functions only).
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            if pool is not None:
+                raise TypeError("with_db_connection(pool=...) only supports synchronous functions")
+            if aiosqlite is None:
+                raise ImportError("aiosqlite is required to decorate coroutine functions")
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                conn = await aiosqlite.connect(path)
+                try:
+                    return await func(conn, *args, **kwargs)
+                finally:
+                    await conn.close()
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if pool is not None:
+                conn = pool.acquire()
+                try:
+                    return func(conn, *args, **kwargs)
+                finally:
+                    pool.release(conn)
+
+            conn = sqlite3.connect(path)
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                conn.close()
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 @with_db_connection 
 def get_user_by_id(conn, user_id): 
@@ -20,4 +112,15 @@ def get_user_by_id(conn, user_id):
 #### Fetch user by ID with automatic connection handling 
 
 user = get_user_by_id(user_id=1)
-print(user)
\ No newline at end of file
+print(user)
+
+users_pool = ConnectionPool("users.db")
+
+@with_db_connection(pool=users_pool)
+def get_user_by_id_pooled(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+#### Same lookup, reusing a pooled connection
+
+print(get_user_by_id_pooled(user_id=1))
@@ -1,10 +1,90 @@
 import sqlite3 
 import functools
+import inspect
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+try:
+    import aiosqlite
+except ImportError:  # Only needed to decorate coroutine functions
+    aiosqlite = None
+
+# The connection of the transaction_batch open in this thread, and how deep
+# its savepoints go
+_batch = threading.local()
+
+
+@contextmanager
+def transaction_batch(conn=None):
+    """Run every @transactional call in the block inside one transaction, committed once
+
+    conn defaults to a new connection to users.db; @with_db_connection calls made
+    in the block are given this connection instead of opening their own. Each
+    @transactional call runs in a savepoint, so a failing call only undoes its
+    own changes. An exception leaving the block rolls everything back.
+    A nested transaction_batch simply joins the outer one.
+    """
+    outer = getattr(_batch, 'conn', None)
+    if outer is not None:
+        yield outer
+        return
+
+    own_connection = conn is None
+    if own_connection:
+        conn = sqlite3.connect("users.db")
+    _batch.conn = conn
+    _batch.depth = 0
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _batch.conn = None
+        if own_connection:
+            conn.close()
+
 
 def transactional(func):
-    """A decorator that manages database transactions by automatically committing or rolling back changes"""
+    """A decorator that manages database transactions by automatically committing or rolling back changes
+
+    Inside a transaction_batch the call joins the batch's transaction through a
+    savepoint instead of committing on its own.
+    Coroutine functions get an async wrapper that awaits the commit or rollback
+    (transaction_batch is for synchronous calls only).
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            try:
+                result = await func(conn, *args, **kwargs)
+                await conn.commit()
+                return result
+            except Exception:
+                await conn.rollback()
+                raise
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        if conn is getattr(_batch, 'conn', None):
+            _batch.depth += 1
+            savepoint = f"transactional_{_batch.depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                result = func(conn, *args, **kwargs)
+            except Exception:
+                conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                raise
+            finally:
+                conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+                _batch.depth -= 1
+            return result
+
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
@@ -16,8 +96,25 @@ def transactional(func):
 
 def with_db_connection(func):
     """A decorator that automatically handles opening and closing database connections""" 
+    if inspect.iscoroutinefunction(func):
+        if aiosqlite is None:
+            raise ImportError("aiosqlite is required to decorate coroutine functions")
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            conn = await aiosqlite.connect("users.db")
+            try:
+                return await func(conn, *args, **kwargs)
+            finally:
+                await conn.close()
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        batch_conn = getattr(_batch, 'conn', None)
+        if batch_conn is not None:
+            # The batch owns its connection and closes it itself
+            return func(batch_conn, *args, **kwargs)
         conn = sqlite3.connect("users.db")
         try:
             return func(conn, *args, **kwargs)
@@ -30,6 +127,42 @@ def with_db_connection(func):
 def update_user_email(conn, user_id, new_email): 
     cursor = conn.cursor() 
     cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+@with_db_connection
+@transactional
+def update_user_emails(conn, pairs, chunk_size=1000):
+    """Update the email of many users from an iterable of (user_id, new_email) pairs
+
+    Pairs are read chunk_size at a time and sent with executemany, all in one
+    transaction. Returns {'updated': ..., 'missing': ...} where missing counts the
+    pairs whose user_id matched no row.
+    """
+    cursor = conn.cursor()
+    pairs = iter(pairs)
+    counts = {'updated': 0, 'missing': 0}
+    while True:
+        chunk = list(islice(pairs, chunk_size))
+        if not chunk:
+            break
+        cursor.executemany("UPDATE users SET email = ? WHERE id = ?",
+                           [(new_email, user_id) for user_id, new_email in chunk])
+        # rowcount adds up the rows matched by every statement of the chunk
+        counts['updated'] += cursor.rowcount
+        counts['missing'] += len(chunk) - cursor.rowcount
+    return counts
 #### Update user's email with automatic transaction handling 
 
-update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
\ No newline at end of file
+update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+
+#### Update many emails in one transaction (one commit instead of one per call)
+
+with transaction_batch() as conn:
+    for user_id, email in conn.execute("SELECT id, email FROM users LIMIT 100").fetchall():
+        update_user_email(user_id=user_id, new_email=email)
+
+#### Bulk update emails from (user_id, new_email) pairs
+
+conn = sqlite3.connect("users.db")
+current_emails = conn.execute("SELECT id, email FROM users").fetchall()
+conn.close()
+print(update_user_emails(current_emails))
@@ -1,24 +1,329 @@
 import time
+import random
+import asyncio
+import inspect
 import sqlite3 
 import functools
+import threading
+from collections import deque
+
+try:
+    import aiosqlite
+except ImportError:  # Only needed to decorate coroutine functions
+    aiosqlite = None
+
+# SQLite result codes of a database or table held by another connection
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+# Primary result codes of a database that is failing, whatever the query:
+# BUSY, LOCKED, NOMEM, READONLY, IOERR, CORRUPT, FULL, CANTOPEN, PROTOCOL, NOTADB.
+# SQLITE_ERROR (1) is left out: SQLite also uses it for syntax errors and missing tables.
+SQLITE_OUTAGE_CODES = (SQLITE_BUSY, SQLITE_LOCKED, 7, 8, 10, 11, 13, 14, 15, 26)
+# Their messages, for errors that don't carry sqlite_errorcode
+SQLITE_OUTAGE_MESSAGES = (
+    'database is locked', 'database table is locked', 'out of memory', 'readonly database',
+    'disk i/o error', 'malformed', 'database or disk is full', 'unable to open database',
+    'locking protocol', 'file is not a database',
+)
+
+
+def is_transient(error):
+    """Tell whether an error is lock contention (SQLITE_BUSY/SQLITE_LOCKED) worth retrying"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        # Extended result codes keep the primary code in their low byte
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def is_outage(error):
+    """Tell whether an error means the database itself is failing (not a bad query or constraint)
+
+    Decided by the SQLite result code: locks, I/O errors, a full disk, a corrupt
+    or unreadable file. Syntax errors and missing tables come as SQLITE_ERROR and
+    are not outages.
+    """
+    if not isinstance(error, sqlite3.DatabaseError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in SQLITE_OUTAGE_CODES
+    message = str(error).lower()
+    return any(text in message for text in SQLITE_OUTAGE_MESSAGES)
+
+
+class RetryBudget:
+    """Token bucket shared by several RetryPolicy objects to cap retry amplification
+
+    Every call deposits `ratio` tokens and every retry spends one, so retries stay
+    around ratio per call however many functions fail at once. `per_second`
+    tokens are also added each second so that low traffic can still retry, and
+    the bucket never holds more than `capacity` tokens.
+    """
+    def __init__(self, ratio=0.2, per_second=1, capacity=10):
+        self.ratio = ratio
+        self.per_second = per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _add(self, tokens):
+        now = time.monotonic()
+        refill = (now - self._updated) * self.per_second
+        self._updated = now
+        self.tokens = min(self.capacity, self.tokens + refill + tokens)
+
+    def deposit(self):
+        """Record a call"""
+        with self._lock:
+            self._add(self.ratio)
+
+    def try_spend(self):
+        """Take a token for a retry, return False when the budget is exhausted"""
+        with self._lock:
+            self._add(0)
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the function while a circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """A decorator that fails fast while a function keeps failing
+
+    - closed: calls go through; when at least min_calls were made in the last
+      `window` seconds and failure_rate of them failed, the circuit opens
+    - open: calls raise CircuitOpenError right away for reset_timeout seconds
+    - half_open: one probe call goes through; success closes the circuit,
+      failure opens it again
+    Only exceptions accepted by failure_if (is_outage by default) count as failures.
+    Every state change starts a new generation; a call's result only counts in
+    the generation it was admitted in, so a slow call started while the circuit
+    was closed can't decide the half-open probe or reopen the circuit.
+    """
+    def __init__(self, failure_rate=0.5, window=30, min_calls=5, reset_timeout=10, failure_if=is_outage):
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.failure_if = failure_if
+        self.state = 'closed'
+        self._calls = deque()  # (time, failed) of the calls in the window
+        self._failures = 0
+        self._opened_at = 0
+        self._probing = False
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _allow(self):
+        """Admit a call: return the generation it was admitted in, or None to refuse it"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return None
+                self._set_state('half_open')
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    return None
+                self._probing = True
+            return self._generation
+
+    def _record(self, generation, failed):
+        with self._lock:
+            if generation != self._generation:
+                # Admitted before the last state change: its result no longer says anything
+                return
+            now = time.monotonic()
+            if self.state == 'half_open':
+                # Only the probe is admitted in a half-open generation
+                self._probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    self._set_state('closed')
+                return
+
+            self._calls.append((now, failed))
+            self._failures += failed
+            while self._calls and now - self._calls[0][0] > self.window:
+                self._failures -= self._calls.popleft()[1]
+            calls = len(self._calls)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                self._open(now)
+
+    def _release(self, generation):
+        # A call that ended without a result doesn't count, but mustn't hold the probe forever
+        with self._lock:
+            if generation == self._generation and self.state == 'half_open':
+                self._probing = False
+
+    def _set_state(self, state):
+        self.state = state
+        self._generation += 1
+
+    def _open(self, now):
+        self._set_state('open')
+        self._opened_at = now
+        self._calls.clear()
+        self._failures = 0
+
+    def call(self, func, *args, **kwargs):
+        """Call func through the breaker"""
+        generation = self._allow()
+        if generation is None:
+            raise CircuitOpenError(f"{func.__name__} is failing, not calling it for now")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(generation, self.failure_if(e))
+            raise
+        except BaseException:
+            # Interrupted (KeyboardInterrupt, SystemExit): no verdict, but free the probe
+            self._release(generation)
+            raise
+        self._record(generation, False)
+        return result
+
+    async def acall(self, func, *args, **kwargs):
+        """Await the coroutine function func through the breaker"""
+        generation = self._allow()
+        if generation is None:
+            raise CircuitOpenError(f"{func.__name__} is failing, not calling it for now")
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            self._record(generation, self.failure_if(e))
+            raise
+        except BaseException:
+            # Cancelled (asyncio.CancelledError, e.g. by wait_for): no verdict, but free the probe
+            self._release(generation)
+            raise
+        self._record(generation, False)
+        return result
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await self.acall(func, *args, **kwargs)
+            async_wrapper.circuit_breaker = self
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        wrapper.circuit_breaker = self
+        return wrapper
+
+
+class RetryPolicy:
+    """How often, how long and on which errors a call is retried
+
+    - retries: attempts in total
+    - delay: base of the exponential backoff, in seconds (delay, 2*delay, 4*delay, ...)
+    - max_delay: cap of a single backoff
+    - deadline: seconds after which no new attempt is started (None for no limit)
+    - jitter: sleep a random time between 0 and the backoff ("full jitter"), so
+      callers that failed together don't retry together
+    - retry_if: predicate choosing which exceptions are retried
+    - budget: a RetryBudget shared with other policies; no retry without a token
+    """
+    def __init__(self, retries=3, delay=2, max_delay=30, deadline=None, jitter=True, retry_if=is_transient,
+                 budget=None):
+        self.retries = retries
+        self.delay = delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.jitter = jitter
+        self.retry_if = retry_if
+        self.budget = budget
+
+    def backoff(self, attempt):
+        """Seconds to wait after the given failed attempt (0 for the first one)"""
+        ceiling = min(self.max_delay, self.delay * 2 ** attempt)
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    def call(self, func, *args, **kwargs):
+        """Call func, retrying it according to the policy"""
+        start = time.monotonic()
+        if self.budget is not None:
+            self.budget.deposit()
+        for attempt in range(self.retries):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries - 1 or not self.retry_if(e):
+                    raise
+                if self.budget is not None and not self.budget.try_spend():
+                    raise
+                pause = self.backoff(attempt)
+                if self.deadline is not None and time.monotonic() - start + pause > self.deadline:
+                    raise
+                time.sleep(pause)
+
+    async def acall(self, func, *args, **kwargs):
+        """Await the coroutine function func, retrying it without blocking the event loop"""
+        start = time.monotonic()
+        if self.budget is not None:
+            self.budget.deposit()
+        for attempt in range(self.retries):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries - 1 or not self.retry_if(e):
+                    raise
+                if self.budget is not None and not self.budget.try_spend():
+                    raise
+                pause = self.backoff(attempt)
+                if self.deadline is not None and time.monotonic() - start + pause > self.deadline:
+                    raise
+                await asyncio.sleep(pause)
+
+
+def retry_on_failure(retries=3, delay=2, **options):  # takes arguments
+    """Build a RetryPolicy from the arguments (see RetryPolicy for the options)"""
+    policy = RetryPolicy(retries=retries, delay=delay, **options)
 
-def retry_on_failure(retries=3, delay=2):  # takes arguments
     def decorator(func): 
-        """A decorator that retries a function upon failure for a specified number of attempts with a delay"""
+        """A decorator that retries a function upon transient failures with exponential backoff"""
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(conn, *args, **kwargs):
+                return await policy.acall(func, conn, *args, **kwargs)
+            async_wrapper.retry_policy = policy
+            return async_wrapper
+
         @functools.wraps(func)
-        def wrapper(conn, *args, retries=3, delay=2, **kwargs):
-            for _ in range(retries):
-                try:
-                    return func(conn, *args, **kwargs)
-                except Exception as e:
-                    last_exception = e
-                    time.sleep(delay)
-            raise last_exception
+        def wrapper(conn, *args, **kwargs):
+            return policy.call(func, conn, *args, **kwargs)
+        wrapper.retry_policy = policy
         return wrapper
     return decorator
 
 def with_db_connection(func):
     """A decorator that automatically handles opening and closing database connections""" 
+    if inspect.iscoroutinefunction(func):
+        if aiosqlite is None:
+            raise ImportError("aiosqlite is required to decorate coroutine functions")
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            conn = await aiosqlite.connect("users.db")
+            try:
+                return await func(conn, *args, **kwargs)
+            finally:
+                await conn.close()
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         conn = sqlite3.connect("users.db")
@@ -38,4 +343,19 @@ def fetch_users_with_retry(conn):
 #### attempt to fetch users with automatic retry on failure
 
 users = fetch_users_with_retry()
-print(users)
\ No newline at end of file
+print(users)
+
+#### share a retry budget and fail fast while users.db is down
+
+users_breaker = CircuitBreaker()
+users_retry_budget = RetryBudget()
+
+@users_breaker
+@with_db_connection
+@retry_on_failure(retries=3, delay=0.1, budget=users_retry_budget)
+def count_users(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users")
+    return cursor.fetchone()[0]
+
+print(count_users())
\ No newline at end of file
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""Peak RSS of stream_users as the number of rows grows
+
+    ./0-benchmark.py [database]
+
+For each row count the scratch database (ALX_prodev_bench by default, never the
+one the generators use) is reseeded with exactly that many users, so the
+buffered cursor loads the whole table and the unbuffered one streams all of it.
+"""
+import resource
+import subprocess
+import sys
+seed = __import__('seed')
+stream_users = __import__('0-stream_users')
+benchmark = __import__('benchmark')
+
+ROW_COUNTS = [1000, 10000, 100000, 1000000]
+
+
+def peak_rss(rows, buffered, database):
+    """Stream `rows` users in a fresh process and return its peak RSS in KB"""
+    # Each run gets its own process because ru_maxrss never goes down
+    output = subprocess.check_output([
+        sys.executable, __file__, 'run', str(rows), str(int(buffered)), database
+    ])
+    return int(output)
+
+
+def run(rows, buffered):
+    """Stream every user and print the peak RSS of this process
+
+    Exits with an error if the table didn't hold the `rows` users expected.
+    """
+    streamed = 0
+    for _ in stream_users.stream_users(buffered=buffered):
+        streamed += 1
+    if streamed != rows:
+        sys.exit(f"Streamed {streamed} rows instead of {rows}")
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == 'run':
+        seed.database = sys.argv[4]
+        run(int(sys.argv[2]), bool(int(sys.argv[3])))
+        sys.exit(0)
+
+    database = sys.argv[1] if len(sys.argv) > 1 else "ALX_prodev_bench"
+    if database == seed.database:
+        sys.exit(f"Refusing to reseed {seed.database}, the generators' own database: "
+                 "pass a scratch database")
+    seed.database = database
+
+    # Peak RSS should stay flat as the row count grows with the unbuffered cursor
+    print(f"{'rows':>10} {'unbuffered (KB)':>16} {'buffered (KB)':>14}")
+    for rows in ROW_COUNTS:
+        benchmark.seed_rows(rows)
+        print(f"{rows:>10} {peak_rss(rows, False, database):>16} {peak_rss(rows, True, database):>14}")
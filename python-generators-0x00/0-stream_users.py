@@ -1,19 +1,35 @@
-seed = __import__('seed')
+connection_pool = __import__('connection_pool')
+user_row = __import__('user_row')
 
 
-def stream_users():
-    """Generator that fetchs rows one by one from the user_data table in the ALX_prodev database"""
-    conn = seed.connect_to_prodev()
-    cursor = conn.cursor(dictionary=True)
+def stream_users(prefetch=1000, buffered=False, row_format='dict'):
+    """Generator that fetchs rows one by one from the user_data table in the ALX_prodev database
 
-    cursor.execute("SELECT * FROM user_data")
-    for row in cursor:
-        yield {
-            'user_id': row['user_id'],
-            'name': row['name'],
-            'email': row['email'],
-            'age': int(row['age'])
-        }
-    
-    cursor.close()
-    conn.close()
\ No newline at end of file
+    By default the cursor is unbuffered (server-side): rows stay on the wire and
+    are pulled `prefetch` at a time, so memory stays flat whatever the table size.
+    Pass buffered=True to load the whole result set client-side first.
+    row_format='object' yields compact user_row.User objects instead of dicts.
+    """
+    if row_format not in ('dict', 'object'):
+        raise ValueError(f"Unknown row_format: {row_format}")
+    build = user_row.User if row_format == 'object' else None
+
+    conn = connection_pool.get_connection()
+    try:
+        # Plain tuples from the driver; each row is built once in the requested shape
+        cursor = conn.cursor(buffered=buffered)
+        cursor.execute("SELECT user_id, name, email, age FROM user_data")
+        while True:
+            # Only `prefetch` rows are held in memory at any time
+            rows = cursor.fetchmany(prefetch)
+            if not rows:
+                break
+            if build:
+                for row in rows:
+                    yield build(*row)
+            else:
+                yield from map(user_row.as_user_dict, rows)
+    finally:
+        # If the consumer stopped early the unread rows are still pending on the
+        # connection: the pool then drops it instead of reading the rest of the table
+        conn.close()
@@ -1,52 +1,75 @@
-seed = __import__('seed')
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+connection_pool = __import__('connection_pool')
+user_row = __import__('user_row')
 
+# age is cast by MySQL so rows come back ready to use without a per-row int()
+USERS_QUERY = "SELECT user_id, name, email, CAST(age AS UNSIGNED) AS age FROM user_data"
+# Header of the rows USERS_QUERY returns, for callers of row_format='tuple'
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
 
-def stream_users_in_batches(batch_size):
-    """Generator function that yields user data in batches of specified size"""
-    conn = seed.connect_to_prodev()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM user_data")
 
-    """
-    # With fetchmany: more efficient
-    while True:
-        batch = cursor.fetchmany(batch_size)
-        if not batch:
-            break
-        yield batch
-    """
+def stream_users_in_batches(batch_size, row_format='dict', min_age=None):
+    """Generator function that yields user data in batches of specified size
 
-    batch = []
-    for row in cursor:
-        batch.append({
-            'user_id': row['user_id'],
-            'name': row['name'],
-            'email': row['email'],
-            'age': int(row['age'])
-        })
-        if len(batch) == batch_size:
-            yield batch
-            batch = []
-    
-    # The last batch might be smaller if it didn't fill up
-    if batch:
-        yield batch
-    
-    cursor.close()
-    conn.close()
-
-
-def batch_processing(batch_size):
-    """Generator function that yields user data in batches of specified size for users older than 25"""
-    batch = next(stream_users_in_batches(batch_size))
-
-    result = [user for user in batch if user['age'] > 25]
+    Rows are pulled with fetchmany(batch_size) as plain tuples sharing one column
+    header. row_format picks the shape of each batch:
+    - 'dict': a list of {column: value} dicts
+    - 'tuple': a list of tuples as fetched, in the column order of USER_COLUMNS
+    - 'columnar': a {column: [values]} dict
+    - 'object': a list of compact user_row.User objects
+    min_age filters in SQL (age > min_age) so non-matching rows never leave MySQL.
     """
-    # To make it a generator yield each processed batch
-    yield result
+    if row_format not in ('dict', 'tuple', 'columnar', 'object'):
+        raise ValueError(f"Unknown row_format: {row_format}")
+
+    conn = connection_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        if min_age is None:
+            cursor.execute(USERS_QUERY)
+        else:
+            cursor.execute(USERS_QUERY + " WHERE age > %s", (min_age,))
+        columns = cursor.column_names
+
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            if row_format == 'tuple':
+                yield batch
+            elif row_format == 'columnar':
+                yield dict(zip(columns, map(list, zip(*batch))))
+            elif row_format == 'object':
+                yield [user_row.User(*row) for row in batch]
+            else:
+                yield [dict(zip(columns, row)) for row in batch]
+    finally:
+        # Returns the connection to the pool
+        conn.close()
 
-    # To print the users in the batch
-    for user in result:
-        print(user)
+
+def batch_processing(batch_size, transform=None, workers=None):
+    """Generator function that yields every batch of user data for users older than 25
+
+    The age filter runs in MySQL. If given, transform(batch) is applied to each batch,
+    in a pool of `workers` processes when workers is set (transform must then be a
+    module-level function so it can be pickled). Batches are yielded in order.
     """
-    return result
\ No newline at end of file
+    batches = stream_users_in_batches(batch_size, min_age=25)
+
+    if transform is None:
+        yield from batches
+    elif not workers:
+        for batch in batches:
+            yield transform(batch)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep only a few batches in flight so a large table isn't read ahead into memory
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(transform, batch))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
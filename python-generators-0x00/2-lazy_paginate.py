@@ -1,30 +1,136 @@
 #!/usr/bin/python3
-seed = __import__('seed')
+import threading
+from queue import Queue, Full
+connection_pool = __import__('connection_pool')
 
 
-def paginate_users(page_size, offset):
-    """Fetch a page of user data from the database"""
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    # Execute a query to fetch user data with LIMIT and OFFSET
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    # Fetch all rows from the executed query
-    rows = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return rows
+def paginate_users(page_size, offset, connection=None):
+    """Fetch a page of user data from the database
 
+    A connection passed in is reused and left open, otherwise one is borrowed from the pool for the page.
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = connection_pool.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        # Execute a query to fetch user data with LIMIT and OFFSET
+        cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+        # Fetch all rows from the executed query
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def paginate_users_after(page_size, last_user_id=None, connection=None):
+    """Fetch the page of user data that follows last_user_id (keyset pagination)
+
+    A connection passed in is reused and left open, otherwise one is borrowed from the pool for the page.
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = connection_pool.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        # Seek straight to the last seen key through the primary key index, so every
+        # page costs the same no matter how deep into the table it is
+        if last_user_id is None:
+            cursor.execute("SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,))
+        else:
+            cursor.execute(
+                "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (last_user_id, page_size)
+            )
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def read_ahead(pages, depth):
+    """Generator that fetches up to `depth` pages ahead of the consumer on a background thread"""
+    queue = Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Wait for room in the queue, but give up as soon as the consumer is gone
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def fetch():
+        # The page generator (and its connection) only ever runs on this thread
+        try:
+            for page in pages:
+                if not put(page):
+                    break
+            else:
+                put(done)
+        except Exception as error:
+            put(error)
+        finally:
+            pages.close()
+
+    thread = threading.Thread(target=fetch, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def lazy_paginate(page_size, mode='keyset', prefetch=0):
+    """Generator that simulates lazy pagination of user data
+
+    mode='keyset' (default) resumes each page from the last seen user_id.
+    mode='offset' uses LIMIT/OFFSET, whose cost grows with every page.
+    All pages are read over a single connection.
+    With prefetch > 0, up to that many next pages are fetched on a background
+    thread while the caller works on the current one.
+    """
+    if mode not in ('keyset', 'offset'):
+        raise ValueError(f"Unknown pagination mode: {mode}")
+
+    if prefetch > 0:
+        yield from read_ahead(lazy_paginate(page_size, mode), prefetch)
+        return
 
-def lazy_paginate(page_size):
-    """Generator that simulates lazy pagination of user data"""
     offset = 0
-    # Infinite loop to fetch pages until no more data is available
-    while True:
-        # Fetch a page of user data
-        page = paginate_users(page_size, offset)
-        # If the generator returns an empty page, break the loop
-        if not page:
-            break
-        # Update the offset for the next page
-        offset += page_size
-        yield page
\ No newline at end of file
+    last_user_id = None
+    # One connection serves every page; it goes back to the pool when the
+    # generator is exhausted, closed or garbage-collected
+    connection = connection_pool.get_connection()
+    try:
+        # Infinite loop to fetch pages until no more data is available
+        while True:
+            # Fetch a page of user data
+            if mode == 'keyset':
+                page = paginate_users_after(page_size, last_user_id, connection)
+            else:
+                page = paginate_users(page_size, offset, connection)
+            # If the generator returns an empty page, break the loop
+            if not page:
+                break
+            # Update the position for the next page
+            offset += page_size
+            last_user_id = page[-1]['user_id']
+            yield page
+    finally:
+        connection.close()
@@ -1,16 +1,44 @@
-seed = __import__('seed')
+from array import array
+connection_pool = __import__('connection_pool')
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, array('i') buffers are used without it
+    np = None
+
+
+def stream_user_age_batches(batch_size=1000):
+    """Generator that streams user ages from the database as lists of batch_size ints"""
+    connection = connection_pool.get_connection()
+    try:
+        # A plain cursor: a single column doesn't need a dict per row
+        cursor = connection.cursor()
+        # Cast in MySQL so ages arrive as ints rather than Decimals
+        cursor.execute("SELECT CAST(age AS UNSIGNED) FROM user_data")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [age for (age,) in rows]
+    finally:
+        connection.close()
+
+
+def stream_user_age_columns(batch_size=10000, use_numpy=False):
+    """Generator that streams user ages as one array('i') (or NumPy int32 array) per batch"""
+    if use_numpy and np is None:
+        raise ImportError("use_numpy=True requires numpy to be installed")
+    for batch in stream_user_age_batches(batch_size):
+        if use_numpy:
+            yield np.fromiter(batch, dtype=np.int32, count=len(batch))
+        else:
+            yield array('i', batch)
 
 
 def stream_user_ages():
     """Generator that streams user ages from the database"""
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    # Execute a query to fetch user ages
-    cursor.execute("SELECT age FROM user_data")
-    for row in cursor:
-        yield row['age']
-    cursor.close()
-    connection.close()
+    for batch in stream_user_age_batches():
+        yield from batch
 
 
 def average_age():
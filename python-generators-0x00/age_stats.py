@@ -0,0 +1,160 @@
+from collections import Counter
+connection_pool = __import__('connection_pool')
+stream_ages = __import__('4-stream_ages')
+
+
+class AgeStats:
+    """Single-pass accumulator for the count, mean, min/max, variance and percentiles of ages
+
+    Batches are merged with Chan's parallel form of Welford's algorithm, so the
+    variance stays stable without keeping the ages around. Ages are whole years in
+    a small range, so an exact histogram stands in for a percentile sketch.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = Counter()
+
+    def update(self, ages):
+        """Fold a batch of ages into the statistics"""
+        n = len(ages)
+        if n == 0:
+            return
+        batch_mean = sum(ages) / n
+        batch_m2 = sum((age - batch_mean) ** 2 for age in ages)
+
+        # Merge the batch moments into the running ones
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+        batch_min, batch_max = min(ages), max(ages)
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+        self.histogram.update(ages)
+
+    @property
+    def variance(self):
+        """Population variance of the ages seen so far"""
+        return self.m2 / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Nearest-rank p-th percentile (0 < p <= 100) of the ages seen so far"""
+        if not self.count:
+            return None
+        rank = max(1, -(-p * self.count // 100))
+        seen = 0
+        for age in sorted(self.histogram):
+            seen += self.histogram[age]
+            if seen >= rank:
+                return age
+
+    def as_dict(self, percentiles=(50, 90, 99)):
+        """Return the statistics as a dict"""
+        stats = {
+            'count': self.count,
+            'mean': self.mean if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'variance': self.variance,
+        }
+        for p in percentiles:
+            stats[f'p{p}'] = self.percentile(p)
+        return stats
+
+
+def sql_age_stats():
+    """Compute count, mean, min/max and variance of ages inside MySQL in a single query"""
+    connection = connection_pool.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(age), AVG(age), MIN(age), MAX(age), VAR_POP(age) FROM user_data")
+        count, mean, min_age, max_age, variance = cursor.fetchone()
+        cursor.close()
+    finally:
+        connection.close()
+    return {
+        'count': count,
+        'mean': None if mean is None else float(mean),
+        'min': None if min_age is None else int(min_age),
+        'max': None if max_age is None else int(max_age),
+        'variance': float(variance or 0),
+    }
+
+
+def age_histogram(batch_size=10000, use_numpy=stream_ages.np is not None):
+    """Count users per age over columnar batches, without a Python step per row
+
+    With NumPy each batch goes through np.bincount, otherwise through Counter,
+    which tallies an array('i') in C.
+    """
+    if not use_numpy:
+        histogram = Counter()
+        for column in stream_ages.stream_user_age_columns(batch_size):
+            histogram.update(column)
+        return dict(sorted(histogram.items()))
+
+    np = stream_ages.np
+    totals = np.zeros(0, dtype=np.int64)
+    for column in stream_ages.stream_user_age_columns(batch_size, use_numpy=True):
+        counts = np.bincount(column)
+        if len(counts) > len(totals):
+            totals = np.pad(totals, (0, len(counts) - len(totals)))
+        totals[:len(counts)] += counts
+    return {int(age): int(count) for age, count in enumerate(totals) if count}
+
+
+def histogram_mean(histogram):
+    """Mean age from an {age: count} histogram"""
+    count = sum(histogram.values())
+    if not count:
+        return None
+    return sum(age * n for age, n in histogram.items()) / count
+
+
+def age_band_counts(histogram, bands=(18, 30, 45, 65)):
+    """Bucket an {age: count} histogram into age bands split at the given ages
+
+    bands=(18, 30) gives {'<18': ..., '18-29': ..., '30+': ...}.
+    """
+    labels = [f"<{bands[0]}"]
+    labels += [f"{low}-{high - 1}" for low, high in zip(bands, bands[1:])]
+    labels.append(f"{bands[-1]}+")
+    counts = dict.fromkeys(labels, 0)
+    for age, n in histogram.items():
+        # Index of the first band boundary above this age
+        band = sum(age >= bound for bound in bands)
+        counts[labels[band]] += n
+    return counts
+
+
+def columnar_age_stats(batch_size=10000, bands=(18, 30, 45, 65), use_numpy=stream_ages.np is not None):
+    """Histogram, mean and age band counts from one columnar pass over the ages"""
+    histogram = age_histogram(batch_size, use_numpy)
+    return {
+        'count': sum(histogram.values()),
+        'mean': histogram_mean(histogram),
+        'bands': age_band_counts(histogram, bands),
+        'histogram': histogram,
+    }
+
+
+def stream_age_stats(batch_size=10000, percentiles=(50, 90, 99)):
+    """Compute age statistics, percentiles included, in one pass over batched rows"""
+    stats = AgeStats()
+    for batch in stream_ages.stream_user_age_batches(batch_size):
+        stats.update(batch)
+    return stats.as_dict(percentiles)
+
+
+if __name__ == "__main__":
+    print(f"SQL: {sql_age_stats()}")
+    print(f"Streamed: {stream_age_stats()}")
+    columnar = columnar_age_stats()
+    print(f"Columnar: mean={columnar['mean']} bands={columnar['bands']}")
@@ -0,0 +1,129 @@
+import asyncio
+import aiomysql
+seed = __import__('seed')
+batch_processing = __import__('1-batch_processing')
+user_row = __import__('user_row')
+
+# Async generators only run when the consumer awaits the next item, and the
+# unbuffered (SS) cursors only read from the socket when asked for rows, so a
+# slow consumer naturally slows the transfer down (backpressure).
+# On cancellation or early exit the connection itself is closed: closing an
+# unbuffered cursor would first read every remaining row.
+
+
+async def connect():
+    """Open an asynchronous connection to the ALX_prodev database"""
+    return await aiomysql.connect(
+        host="localhost",
+        user=seed.user,
+        password=seed.password,
+        db=seed.database
+    )
+
+
+async def astream_users(prefetch=1000):
+    """Async generator that fetchs rows one by one from the user_data table"""
+    conn = await connect()
+    try:
+        cursor = await conn.cursor(aiomysql.SSDictCursor)
+        await cursor.execute("SELECT * FROM user_data")
+        while True:
+            rows = await cursor.fetchmany(prefetch)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    'user_id': row['user_id'],
+                    'name': row['name'],
+                    'email': row['email'],
+                    'age': int(row['age'])
+                }
+    finally:
+        conn.close()
+
+
+async def astream_users_in_batches(batch_size, row_format='dict', min_age=None):
+    """Async generator that yields user data in batches of specified size
+
+    Same row formats and age filter as stream_users_in_batches.
+    """
+    if row_format not in ('dict', 'tuple', 'columnar', 'object'):
+        raise ValueError(f"Unknown row_format: {row_format}")
+
+    conn = await connect()
+    try:
+        cursor = await conn.cursor(aiomysql.SSCursor)
+        if min_age is None:
+            await cursor.execute(batch_processing.USERS_QUERY)
+        else:
+            await cursor.execute(batch_processing.USERS_QUERY + " WHERE age > %s", (min_age,))
+        columns = [column[0] for column in cursor.description]
+
+        while True:
+            batch = await cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            if row_format == 'tuple':
+                yield batch
+            elif row_format == 'columnar':
+                yield dict(zip(columns, map(list, zip(*batch))))
+            elif row_format == 'object':
+                yield [user_row.User(*row) for row in batch]
+            else:
+                yield [dict(zip(columns, row)) for row in batch]
+    finally:
+        conn.close()
+
+
+async def alazy_paginate(page_size):
+    """Async generator that lazily paginates user data by user_id (keyset pagination)"""
+    conn = await connect()
+    try:
+        cursor = await conn.cursor(aiomysql.DictCursor)
+        last_user_id = None
+        while True:
+            if last_user_id is None:
+                await cursor.execute("SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,))
+            else:
+                await cursor.execute(
+                    "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                    (last_user_id, page_size)
+                )
+            page = await cursor.fetchall()
+            if not page:
+                break
+            last_user_id = page[-1]['user_id']
+            yield list(page)
+    finally:
+        conn.close()
+
+
+async def astream_user_ages(batch_size=1000):
+    """Async generator that streams user ages from the database"""
+    conn = await connect()
+    try:
+        cursor = await conn.cursor(aiomysql.SSCursor)
+        await cursor.execute("SELECT CAST(age AS UNSIGNED) FROM user_data")
+        while True:
+            rows = await cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (age,) in rows:
+                yield age
+    finally:
+        conn.close()
+
+
+async def count_users_concurrently(streams=10):
+    """Run several user streams at once in a single thread"""
+    async def count(stream):
+        total = 0
+        async for _ in stream:
+            total += 1
+        return total
+
+    return await asyncio.gather(*(count(astream_users()) for _ in range(streams)))
+
+
+if __name__ == "__main__":
+    print(asyncio.run(count_users_concurrently()))
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+"""Benchmark the access patterns of the python-generators-0x00 generators
+
+Seeds a scratch MySQL database (--database, ALX_prodev_bench by default, never
+the one the generators use) with a given number of synthetic users, runs each
+generator over the whole table in its own process and prints the results as JSON:
+
+    ./benchmark.py --rows 100000 --output results.json
+
+For every generator: rows, rows/sec, time to first row, peak RSS and the
+number of SELECT statements the generator's own connections ran.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+seed = __import__('seed')
+
+# name -> (module, function building the generator from it, how many rows one item holds)
+GENERATORS = {
+    'stream_users': ('0-stream_users', lambda module: module.stream_users(), 'row'),
+    'stream_users_in_batches': (
+        '1-batch_processing', lambda module: module.stream_users_in_batches(1000), 'batch'
+    ),
+    'lazy_paginate': ('2-lazy_paginate', lambda module: module.lazy_paginate(1000), 'batch'),
+    'lazy_paginate_offset': (
+        '2-lazy_paginate', lambda module: module.lazy_paginate(1000, mode='offset'), 'batch'
+    ),
+    'stream_user_ages': ('4-stream_ages', lambda module: module.stream_user_ages(), 'row'),
+}
+
+
+# SELECTs run by the open connections of one client process, found through the
+# _pid attribute mysql-connector sends when connecting, leaving out the
+# connection running this query. Other clients of the server are not counted.
+SELECT_COUNT_QUERY = """
+    SELECT COALESCE(SUM(s.COUNT_STAR), 0)
+    FROM performance_schema.events_statements_summary_by_thread_by_event_name s
+    JOIN performance_schema.threads t ON t.THREAD_ID = s.THREAD_ID
+    JOIN performance_schema.session_connect_attrs a ON a.PROCESSLIST_ID = t.PROCESSLIST_ID
+    WHERE s.EVENT_NAME = 'statement/sql/select'
+      AND a.ATTR_NAME = '_pid' AND a.ATTR_VALUE = %s
+      AND t.PROCESSLIST_ID <> CONNECTION_ID()
+"""
+
+
+def select_count():
+    """Number of SELECT statements this process's open connections have run
+
+    Connections closed before the count (rather than returned to the pool) are missed.
+    """
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute(SELECT_COUNT_QUERY, (str(os.getpid()),))
+    count = int(cursor.fetchone()[0])
+    cursor.close()
+    connection.close()
+    return count
+
+
+def seed_rows(rows):
+    """Recreate user_data in the scratch database with `rows` synthetic users"""
+    connection = seed.connect_db()
+    seed.create_database(connection)
+    connection.close()
+
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS user_data")
+    cursor.close()
+    seed.create_table(connection)
+    users = ([f"User {i}", f"user{i}@example.com", str(18 + i % 80)] for i in range(rows))
+    seed.insert_rows(connection, users, (0, 1, 2), batch_size=5000)
+    connection.close()
+
+
+def run(name):
+    """Run one generator over the whole table and return its measurements"""
+    module_name, generator, unit = GENERATORS[name]
+    module = __import__(module_name)
+
+    before = select_count()
+    start = time.perf_counter()
+    first_row = None
+    rows = 0
+    for item in generator(module):
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        rows += len(item) if unit == 'batch' else 1
+    elapsed = time.perf_counter() - start
+    queries = select_count() - before
+
+    return {
+        'generator': name,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else None,
+        'time_to_first_row': first_row,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'queries': queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default="ALX_prodev_bench",
+                        help="scratch database to seed and scan (default: ALX_prodev_bench)")
+    parser.add_argument('--rows', type=int, default=100000, help="users to seed (default: 100000)")
+    parser.add_argument('--no-seed', action='store_true', help="reuse the table already in --database")
+    parser.add_argument('--only', nargs='+', choices=GENERATORS, help="generators to run (default: all)")
+    parser.add_argument('--output', help="write the JSON results to this file instead of stdout")
+    parser.add_argument('--run', choices=GENERATORS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.database == seed.database:
+        sys.exit(f"Refusing to benchmark in {seed.database}, the generators' own database: "
+                 "pass a scratch --database")
+    # Only this process and its children point the generators at the scratch database
+    seed.database = args.database
+
+    if args.run:
+        # Child process: one generator, so peak RSS belongs to it alone
+        print(json.dumps(run(args.run)))
+        return
+
+    if not args.no_seed:
+        seed_rows(args.rows)
+
+    results = []
+    for name in args.only or GENERATORS:
+        output = subprocess.check_output([sys.executable, __file__, '--database', args.database, '--run', name])
+        results.append(json.loads(output.splitlines()[-1]))
+
+    report = json.dumps({
+        'database': seed.database,
+        'table_rows': None if args.no_seed else args.rows,
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
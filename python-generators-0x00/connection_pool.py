@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+import warnings
+from mysql.connector.errors import Error, PoolError
+seed = __import__('seed')
+
+
+class PooledConnection:
+    """A connection borrowed from a ConnectionPool
+
+    It behaves like the underlying connection, except that close() hands it
+    back to the pool instead of closing it. One that is garbage-collected
+    without being closed is closed with a ResourceWarning and frees its slot.
+    """
+
+    def __init__(self, pool, connection, created):
+        self._pool = pool
+        self._connection = connection
+        self.created = created
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise PoolError("Connection was already returned to the pool")
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Return the connection to its pool"""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection, self.created)
+
+    def __del__(self):
+        # __dict__ rather than the attribute: __getattr__ would recurse if __init__ never ran
+        connection = self.__dict__.get('_connection')
+        if connection is not None:
+            self._connection = None
+            warnings.warn("PooledConnection garbage-collected without close()", ResourceWarning)
+            self._pool.abandon(connection)
+
+
+class ConnectionPool:
+    """Bounded pool of connections to the ALX_prodev database
+
+    - size: most connections checked out at once
+    - timeout: seconds acquire() waits for a free connection before raising PoolError
+    - max_lifetime: seconds after which a connection is closed instead of reused
+    - health_check_after: idle seconds after which a connection is pinged before reuse
+    """
+
+    def __init__(self, size=5, timeout=30, max_lifetime=3600, health_check_after=30,
+                 connect=seed.connect_to_prodev):
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.connect = connect
+        # Idle connections as (connection, created, last_used), most recently used last
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Check out a connection, reusing a healthy idle one when possible"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"No connection available after {self.timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    idle = self._idle.pop() if self._idle else None
+                if idle is None:
+                    return PooledConnection(self, self.connect(), time.monotonic())
+
+                connection, created, last_used = idle
+                now = time.monotonic()
+                if now - created >= self.max_lifetime:
+                    self._discard(connection)
+                elif now - last_used >= self.health_check_after and not connection.is_connected():
+                    self._discard(connection)
+                else:
+                    return PooledConnection(self, connection, created)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, created):
+        """Take back a checked-out connection"""
+        try:
+            if connection.unread_result:
+                # An abandoned unbuffered cursor: reading the rest of its rows could
+                # take longer than opening a new connection
+                self._discard(connection)
+            else:
+                # End the read transaction so the next user doesn't get a stale snapshot
+                connection.rollback()
+                with self._lock:
+                    self._idle.append((connection, created, time.monotonic()))
+        except Error:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def abandon(self, connection):
+        """Close a checked-out connection that was never given back, and free its slot"""
+        try:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """Return the process-wide pool, sized by the DB_POOL_SIZE environment variable"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A forked worker must not share its parent's sockets
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(size=int(os.getenv("DB_POOL_SIZE", 5)))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def get_connection():
+    """Borrow a connection to ALX_prodev from the default pool; close() returns it"""
+    return default_pool().acquire()
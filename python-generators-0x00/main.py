@@ -12,12 +12,12 @@ if connection:
 
     if connection:
         seed.create_table(connection)
-        seed.insert_data(connection, 'user_data.csv')
+        seed.sync_data(connection, 'user_data.csv')
         cursor = connection.cursor()
-        cursor.execute(f"SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_NAME = 'ALX_prodev';")
+        cursor.execute("SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_NAME = %s;", (seed.database,))
         result = cursor.fetchone()
         if result:
-            print(f"Database ALX_prodev is present ")
+            print(f"Database {seed.database} is present ")
         cursor.execute(f"SELECT * FROM user_data LIMIT 5;")
         rows = cursor.fetchall()
         print(rows)
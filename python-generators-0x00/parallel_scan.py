@@ -0,0 +1,134 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Full
+connection_pool = __import__('connection_pool')
+
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+
+def key_ranges(shards):
+    """Split the user_id keyspace into `shards` (low, high) ranges
+
+    The split is on the first four hex digits, which gives ranges of about the
+    same size only because every writer in this directory stores random or
+    hash-based ids (version 4 from insert_rows and LOAD DATA, version 5 from
+    sync_data). Time-ordered ids such as MySQL's UUID() would crowd into one range.
+    The first low and last high are None.
+    """
+    bounds = [f"{i * 0x10000 // shards:04x}" for i in range(1, shards)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def scan_range(low, high, columns=USER_COLUMNS, batch_size=1000):
+    """Generator that yields batches of rows (tuples) with low <= user_id < high, in user_id order"""
+    conditions, params = [], []
+    if low is not None:
+        conditions.append("user_id >= %s")
+        params.append(low)
+    if high is not None:
+        conditions.append("user_id < %s")
+        params.append(high)
+    query = f"SELECT {', '.join(columns)} FROM user_data"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY user_id"
+
+    connection = connection_pool.get_connection()
+    try:
+        # Unbuffered: each range streams through the primary key index
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
+    finally:
+        connection.close()
+
+
+def parallel_scan_batches(columns=USER_COLUMNS, shards=4, ordered=False, batch_size=1000, depth=4):
+    """Generator that scans user_data with one worker thread and connection per key range
+
+    Batches (lists of tuples) are yielded as workers produce them, or in user_id
+    order with ordered=True. Each range buffers at most `depth` batches ahead of
+    the consumer. At most as many ranges as the default pool has connections are
+    scanned at once.
+    """
+    ranges = key_ranges(shards)
+    stop = threading.Event()
+    done = object()
+    # Ordered: one queue per range, drained in turn. Unordered: one shared queue
+    queues = [Queue(maxsize=depth) for _ in ranges] if ordered else [Queue(maxsize=depth * shards)]
+
+    def put(queue, item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def scan(index, low, high):
+        queue = queues[index] if ordered else queues[0]
+        if stop.is_set():
+            # The consumer is gone: don't start a range that was still queued
+            return
+        batches = scan_range(low, high, columns, batch_size)
+        try:
+            for batch in batches:
+                if not put(queue, batch):
+                    break
+            else:
+                put(queue, done)
+        except Exception as error:
+            put(queue, error)
+        finally:
+            batches.close()
+
+    workers = min(shards, connection_pool.default_pool().size)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for index, (low, high) in enumerate(ranges):
+            executor.submit(scan, index, low, high)
+
+        remaining = len(ranges)
+        for queue in queues:
+            while remaining:
+                item = queue.get()
+                if item is done:
+                    remaining -= 1
+                    if ordered:
+                        break
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        stop.set()
+        # Ranges not started yet are dropped rather than scanned and thrown away
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parallel_stream_users(shards=4, ordered=False, batch_size=1000):
+    """Generator that yields the same user dicts as stream_users from a parallel scan"""
+    for batch in parallel_scan_batches(USER_COLUMNS, shards, ordered, batch_size):
+        for user_id, name, email, age in batch:
+            yield {'user_id': user_id, 'name': name, 'email': email, 'age': int(age)}
+
+
+def parallel_average_age(shards=4, batch_size=10000):
+    """Calculate the average age of users with a parallel scan over the age column"""
+    total_age = 0
+    count = 0
+    for batch in parallel_scan_batches(('CAST(age AS UNSIGNED)',), shards, batch_size=batch_size):
+        total_age += sum(age for (age,) in batch)
+        count += len(batch)
+    if count == 0:
+        return 0
+    return total_age / count
+
+
+if __name__ == "__main__":
+    print(f"Average age of users: {parallel_average_age()}")
@@ -1,12 +1,17 @@
 import os
+import time
 import mysql.connector
 import csv
 import uuid
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
 user = os.getenv("DB_USERNAME")
 password = os.getenv("DB_PASSWORD")
+# Namespaced: DB_NAME already belongs to messaging_app and may be in the environment
+database = os.getenv("PRODEV_DB_NAME", "ALX_prodev")
 
 
 def connect_db():
@@ -24,17 +29,18 @@ def create_database(connection):
     """Create ALX_prodev database if it doesn't exist"""
     # Create a cursor object
     cursor = connection.cursor()
-    cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev")
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
     cursor.close()
 
 
-def connect_to_prodev():
+def connect_to_prodev(allow_local_infile=False):
     """Connect to ALX_prodev database"""
     conn = mysql.connector.connect(
         host="localhost",
         user=user,
         password=password,
-        database="ALX_prodev"
+        database=database,
+        allow_local_infile=allow_local_infile
     )
     return conn
 
@@ -75,4 +81,264 @@ def insert_data(connection, data):
             """, (user_id, name, email, age))
     # Commit the data to the database
     connection.commit()
-    cursor.close()
\ No newline at end of file
+    cursor.close()
+
+
+INSERT_QUERY = """
+    INSERT INTO user_data (user_id, name, email, age)
+    VALUES (%s, %s, %s, %s)
+"""
+
+# user_id is generated by MySQL since the CSV has no id column. It is a random
+# (version 4) UUID like insert_rows makes: UUID() gives time-ordered version 1 ids,
+# which would all share a few prefixes and defeat parallel_scan.key_ranges
+LOAD_DATA_QUERY = """
+    LOAD DATA LOCAL INFILE %s INTO TABLE user_data
+    FIELDS TERMINATED BY ',' ENCLOSED BY '"'
+    LINES TERMINATED BY '\\n'
+    IGNORE 1 LINES
+    (name, email, age)
+    SET user_id = LOWER(CONCAT_WS('-',
+        HEX(RANDOM_BYTES(4)),
+        HEX(RANDOM_BYTES(2)),
+        CONCAT('4', SUBSTR(HEX(RANDOM_BYTES(2)), 2)),
+        CONCAT(HEX(8 + FLOOR(RAND() * 4)), SUBSTR(HEX(RANDOM_BYTES(2)), 2)),
+        HEX(RANDOM_BYTES(6))
+    ))
+"""
+
+
+def csv_columns(header):
+    """Return the positions of the name, email and age columns in a CSV header"""
+    return tuple(header.index(column) for column in ("name", "email", "age"))
+
+
+def insert_rows(connection, reader, columns, batch_size=1000, commit_size=50000):
+    """Insert CSV rows from reader into user_data in batches and return how many were inserted
+
+    Rows are sent batch_size at a time with executemany, which mysql-connector turns
+    into one multi-row INSERT, and committed every commit_size rows.
+    """
+    name, email, age = columns
+    cursor = connection.cursor()
+    rows = 0
+    uncommitted = 0
+
+    batch = []
+    for row in reader:
+        batch.append((str(uuid.uuid4()), row[name], row[email], row[age]))
+        if len(batch) == batch_size:
+            cursor.executemany(INSERT_QUERY, batch)
+            rows += len(batch)
+            uncommitted += len(batch)
+            batch = []
+            if uncommitted >= commit_size:
+                connection.commit()
+                uncommitted = 0
+    if batch:
+        cursor.executemany(INSERT_QUERY, batch)
+        rows += len(batch)
+
+    connection.commit()
+    cursor.close()
+    return rows
+
+
+def report_rate(rows, elapsed):
+    """Print and return the number of rows loaded per second"""
+    rate = rows / elapsed if elapsed else 0
+    print(f"Loaded {rows} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+    return rate
+
+
+def bulk_insert_data(connection, data, batch_size=1000, commit_size=50000, load_data=False):
+    """Bulk load data from CSV file into user_data table and return the rows loaded per second
+
+    Rows go through insert_rows (batched executemany, chunked commits).
+    With load_data=True the file is handed to MySQL with LOAD DATA LOCAL INFILE
+    instead (the connection must be opened with allow_local_infile=True).
+    """
+    start = time.perf_counter()
+
+    if load_data:
+        cursor = connection.cursor()
+        cursor.execute(LOAD_DATA_QUERY, (os.path.abspath(data),))
+        rows = cursor.rowcount
+        connection.commit()
+        cursor.close()
+    else:
+        with open(data, newline='', encoding='utf-8') as f:
+            # A plain reader: the columns are looked up once from the header
+            reader = csv.reader(f)
+            columns = csv_columns(next(reader))
+            rows = insert_rows(connection, reader, columns, batch_size, commit_size)
+
+    return report_rate(rows, time.perf_counter() - start)
+
+
+def csv_chunks(data, count):
+    """Split a CSV file into at most count (start, end) byte ranges aligned on line boundaries
+
+    The header line is left out. Quoted fields must not contain newlines.
+    """
+    size = os.path.getsize(data)
+    with open(data, 'rb') as f:
+        f.readline()
+        body_start = f.tell()
+        bounds = [body_start]
+        for i in range(1, count):
+            position = body_start + (size - body_start) * i // count
+            if position <= bounds[-1]:
+                continue
+            # Move the boundary forward to the start of the next line
+            f.seek(position)
+            f.readline()
+            if f.tell() > bounds[-1] and f.tell() < size:
+                bounds.append(f.tell())
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def chunk_lines(f, start, end):
+    """Generator that yields the decoded lines of the byte range start-end of a binary file
+
+    Lines are read one at a time, so only the current insert batch is held in memory.
+    """
+    f.seek(start)
+    position = start
+    while position < end:
+        line = f.readline()
+        if not line:
+            break
+        # Count bytes rather than calling tell(): the ranges are byte offsets
+        position += len(line)
+        yield line.decode('utf-8')
+
+
+def load_chunk(data, start, end, columns, batch_size, commit_size):
+    """Parse one byte range of a CSV file and insert it over a connection of its own"""
+    connection = connect_to_prodev()
+    try:
+        with open(data, 'rb') as f:
+            reader = csv.reader(chunk_lines(f, start, end))
+            return insert_rows(connection, reader, columns, batch_size, commit_size)
+    finally:
+        connection.close()
+
+
+def parallel_insert_data(data, workers=None, batch_size=1000, commit_size=50000):
+    """Load data from CSV file into user_data table with a pool of worker processes
+
+    The file is split into one line-aligned byte range per worker; each worker
+    parses its range and inserts it through its own connection.
+    Returns the rows loaded per second.
+    """
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+
+    with open(data, newline='', encoding='utf-8') as f:
+        columns = csv_columns(next(csv.reader(f)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(load_chunk, data, chunk_start, chunk_end, columns, batch_size, commit_size)
+            for chunk_start, chunk_end in csv_chunks(data, workers)
+        ]
+        rows = sum(future.result() for future in futures)
+
+    return report_rate(rows, time.perf_counter() - start)
+
+
+# Namespace for the stable user ids derived from emails
+USER_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "ALX_prodev.user_data")
+
+UPSERT_QUERY = """
+    INSERT INTO user_data (user_id, name, email, age)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE name = VALUES(name), email = VALUES(email), age = VALUES(age)
+"""
+
+# Same content hash as row_hash, computed by MySQL over the stored rows
+STORED_HASHES_QUERY = """
+    SELECT user_id, email, MD5(CONCAT_WS(CHAR(31), name, email, age)) FROM user_data
+"""
+
+DELETE_QUERY = "DELETE FROM user_data WHERE user_id = %s"
+
+
+def email_key(email):
+    """Normalize an email the way stable_user_id does, to match rows by email"""
+    return email.strip().lower()
+
+
+def stable_user_id(email):
+    """Derive a user_id that stays the same across seedings (UUIDv5 over the email)"""
+    return str(uuid.uuid5(USER_NAMESPACE, email_key(email)))
+
+
+def row_hash(name, email, age):
+    """Hash the content of a row so unchanged rows can be skipped"""
+    return hashlib.md5("\x1f".join((name, email, age)).encode('utf-8')).hexdigest()
+
+
+def sync_data(connection, data, batch_size=1000, prune=False):
+    """Incrementally sync data from CSV file into user_data table
+
+    Rows are matched to the stored ones by email. A stored row keeps its user_id,
+    even a random one from insert_data, and a new row gets a stable user_id
+    derived from its email. Only new or changed rows are upserted, so re-running
+    the seed doesn't duplicate users.
+    CSV rows sharing an email are collapsed into the last one, so the stored
+    row doesn't flip between them from one run to the next.
+    Stored rows that match no CSV row (removed from the file, an email that
+    changed, or a duplicate of an email) are kept unless prune=True deletes them.
+    Returns a dict with the number of inserted, updated, unchanged, deleted and
+    duplicate (collapsed) rows.
+    """
+    cursor = connection.cursor()
+    cursor.execute(STORED_HASHES_QUERY)
+    # email -> (user_id, hash) of the first stored row with that email
+    stored = {}
+    unmatched = set()
+    for user_id, stored_email, stored_hash in cursor.fetchall():
+        stored.setdefault(email_key(stored_email), (user_id, stored_hash))
+        unmatched.add(user_id)
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'duplicates': 0}
+    with open(data, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        name, email, age = csv_columns(next(reader))
+        # email -> (name, email, age) of the last CSV row with that email
+        rows = {}
+        for row in reader:
+            rows[email_key(row[email])] = (row[name], row[email], row[age])
+            counts['duplicates'] += 1
+        counts['duplicates'] -= len(rows)
+
+    batch = []
+    for key, row in rows.items():
+        user_id, stored_hash = stored.get(key, (None, None))
+        if user_id is None:
+            user_id = stable_user_id(row[1])
+        unmatched.discard(user_id)
+        if stored_hash == row_hash(*row):
+            counts['unchanged'] += 1
+            continue
+        counts['inserted' if stored_hash is None else 'updated'] += 1
+        batch.append((user_id, *row))
+        if len(batch) == batch_size:
+            cursor.executemany(UPSERT_QUERY, batch)
+            batch = []
+    if batch:
+        cursor.executemany(UPSERT_QUERY, batch)
+
+    if prune and unmatched:
+        unmatched = [(user_id,) for user_id in unmatched]
+        for i in range(0, len(unmatched), batch_size):
+            cursor.executemany(DELETE_QUERY, unmatched[i:i + batch_size])
+        counts['deleted'] = len(unmatched)
+
+    connection.commit()
+    cursor.close()
+    print(f"Synced user_data: {counts}")
+    return counts
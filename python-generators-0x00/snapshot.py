@@ -0,0 +1,190 @@
+import mmap
+import shutil
+import struct
+import sys
+from array import array
+from tempfile import TemporaryFile
+stream_users = __import__('0-stream_users')
+user_row = __import__('user_row')
+
+# File layout (little-endian), every section starting on an 8-byte boundary:
+#   header       magic, row count, then the offset of each section and the file end
+#   ages         int32 per row
+#   name index   uint64 per row + 1: where each name starts in the name data
+#   email index  uint64 per row + 1: where each email starts in the email data
+#   user ids     36 ASCII bytes per row
+#   name data    UTF-8 names, back to back
+#   email data   UTF-8 emails, back to back
+MAGIC = b'USRSNAP1'
+HEADER = struct.Struct('<8sQ7Q')
+SECTIONS = ('ages', 'name_index', 'email_index', 'user_ids', 'names', 'emails')
+USER_ID_SIZE = 36
+CHUNK_ROWS = 10000
+
+
+def little_endian(values):
+    """Return the bytes of an array in little-endian order"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def export_snapshot(path, users=None):
+    """Write a stream of users (stream_users() by default) to a binary columnar snapshot
+
+    Columns are spooled to temporary files, so memory stays flat whatever the
+    number of rows. Returns the number of rows written.
+    """
+    if users is None:
+        users = stream_users.stream_users()
+
+    spools = {section: TemporaryFile() for section in SECTIONS}
+    try:
+        rows = 0
+        name_end = email_end = 0
+        spools['name_index'].write(little_endian(array('Q', [0])))
+        spools['email_index'].write(little_endian(array('Q', [0])))
+
+        def flush(ages, name_index, email_index, user_ids, names, emails):
+            spools['ages'].write(little_endian(ages))
+            spools['name_index'].write(little_endian(name_index))
+            spools['email_index'].write(little_endian(email_index))
+            spools['user_ids'].write(user_ids)
+            spools['names'].write(names)
+            spools['emails'].write(emails)
+
+        chunk = (array('i'), array('Q'), array('Q'), bytearray(), bytearray(), bytearray())
+        for user in users:
+            ages, name_index, email_index, user_ids, names, emails = chunk
+            if isinstance(user, dict):
+                user = user_row.User(user['user_id'], user['name'], user['email'], user['age'])
+            user_id = user.user_id.encode('ascii')
+            if len(user_id) != USER_ID_SIZE:
+                raise ValueError(f"user_id must be {USER_ID_SIZE} characters: {user.user_id!r}")
+            name = user.name.encode('utf-8')
+            email = user.email.encode('utf-8')
+            name_end += len(name)
+            email_end += len(email)
+
+            ages.append(user.age)
+            name_index.append(name_end)
+            email_index.append(email_end)
+            user_ids += user_id
+            names += name
+            emails += email
+            rows += 1
+            if len(ages) == CHUNK_ROWS:
+                flush(*chunk)
+                chunk = (array('i'), array('Q'), array('Q'), bytearray(), bytearray(), bytearray())
+        flush(*chunk)
+
+        with open(path, 'wb') as f:
+            f.write(bytes(HEADER.size))
+            offsets = []
+            for section in SECTIONS:
+                # Pad so the section can be cast from the memory map directly
+                f.write(bytes(-f.tell() % 8))
+                offsets.append(f.tell())
+                spools[section].seek(0)
+                shutil.copyfileobj(spools[section], f)
+            offsets.append(f.tell())
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, rows, *offsets))
+        return rows
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot written by export_snapshot
+
+    Rows can be read in order or by position through the name and email indexes.
+    Use it as a context manager, or call close() when done.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, *offsets = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a user_data snapshot")
+
+        bounds = dict(zip(SECTIONS, zip(offsets, offsets[1:])))
+        view = memoryview(self._map)
+        self._views = [view]
+        self.ages = self._cast(view, bounds['ages'], 'i')
+        self._name_index = self._cast(view, bounds['name_index'], 'Q')
+        self._email_index = self._cast(view, bounds['email_index'], 'Q')
+        self._user_ids = bounds['user_ids'][0]
+        self._names = bounds['names'][0]
+        self._emails = bounds['emails'][0]
+
+    def _cast(self, view, bounds, typecode):
+        start, end = bounds
+        values = view[start:end]
+        if sys.byteorder == 'big':
+            # Big-endian hosts get a byte-swapped copy instead of a view
+            values = array(typecode, values.tobytes())
+            values.byteswap()
+        else:
+            values = values.cast(typecode)
+        self._views.append(values)
+        return values
+
+    def __len__(self):
+        return self.rows
+
+    def row(self, index):
+        """Return the (user_id, name, email, age) tuple at position index"""
+        if not 0 <= index < self.rows:
+            raise IndexError(f"row {index} out of range")
+        data = self._map
+        user_id = self._user_ids + index * USER_ID_SIZE
+        name_start = self._names + self._name_index[index]
+        name_end = self._names + self._name_index[index + 1]
+        email_start = self._emails + self._email_index[index]
+        email_end = self._emails + self._email_index[index + 1]
+        return (
+            data[user_id:user_id + USER_ID_SIZE].decode('ascii'),
+            data[name_start:name_end].decode('utf-8'),
+            data[email_start:email_end].decode('utf-8'),
+            self.ages[index],
+        )
+
+    def __iter__(self):
+        return map(self.row, range(self.rows))
+
+    def close(self):
+        """Release the memory map and the file"""
+        for view in reversed(getattr(self, '_views', [])):
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def stream_users_from_snapshot(path, row_format='dict'):
+    """Generator that replays the users of a snapshot one by one, like stream_users"""
+    if row_format not in ('dict', 'object'):
+        raise ValueError(f"Unknown row_format: {row_format}")
+
+    with Snapshot(path) as snapshot:
+        for row in snapshot:
+            if row_format == 'object':
+                yield user_row.User(*row)
+            else:
+                yield user_row.as_user_dict(row)
+
+
+if __name__ == "__main__":
+    print(f"Exported {export_snapshot('user_data.snap')} users to user_data.snap")